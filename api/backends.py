@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from .hashing import hash_password, verify_password
+
+
+class PooledModelBackend(ModelBackend):
+    # Same checks as ModelBackend, but the password work goes through the
+    # bounded hashing pool so login spikes are shed with a 429.
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as known ones
+            hash_password(password)
+            return None
+
+        if not verify_password(password, user.password):
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+
+        # Upgrade hashes made with an old hasher or old iteration counts
+        hasher = identify_hasher(user.password)
+        if hasher.algorithm != get_hasher('default').algorithm or hasher.must_update(user.password):
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
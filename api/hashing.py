@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+# PBKDF2 runs inside OpenSSL with the GIL released, so a thread pool is
+# enough to keep hashing off the request threads without paying for
+# pickling into a process pool.
+
+
+class HashingPoolSaturated(Exception):
+    # Raised from auth backends too, so it can't be a DRF exception; the
+    # middleware in api/middleware.py turns it into a 429 for every view
+    retry_after = 1
+
+
+class HashingPool:
+    def __init__(self, workers, queue_depth):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Jobs running plus jobs waiting; anything beyond this is rejected
+        self.slots = threading.BoundedSemaphore(workers + queue_depth)
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    getattr(settings, 'PASSWORD_HASH_WORKERS', 4),
+                    getattr(settings, 'PASSWORD_HASH_QUEUE_DEPTH', 32),
+                )
+    return _pool
+
+
+def hash_password(raw_password):
+    return get_pool().run(make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    return get_pool().run(check_password, raw_password, encoded)
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+from api.hashing import HashingPool, HashingPoolSaturated
+
+
+class Command(BaseCommand):
+    help = "Benchmark password checks per second against PBKDF2 iteration counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, nargs="+",
+            default=[100_000, 260_000, 600_000, PBKDF2PasswordHasher.iterations],
+        )
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument("--clients", type=int, default=64, help="concurrent login requests")
+        parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+        parser.add_argument("--queue-depth", type=int, default=settings.PASSWORD_HASH_QUEUE_DEPTH)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['logins']} logins, {options['clients']} clients, "
+            f"{options['workers']} workers, queue depth {options['queue_depth']}"
+        )
+        self.stdout.write(f"{'iterations':>12} {'logins/s':>10} {'ms/login':>10} {'rejected':>9}")
+        for iterations in sorted(set(options["iterations"])):
+            self.bench(iterations, options)
+
+    def bench(self, iterations, options):
+        hasher = PBKDF2PasswordHasher()
+        hasher.iterations = iterations
+        encoded = hasher.encode("correct horse battery staple", hasher.salt())
+        pool = HashingPool(options["workers"], options["queue_depth"])
+
+        def login(_):
+            try:
+                return pool.run(hasher.verify, "correct horse battery staple", encoded)
+            except HashingPoolSaturated:
+                return None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["clients"]) as clients:
+            results = list(clients.map(login, range(options["logins"])))
+        elapsed = time.perf_counter() - start
+        pool.executor.shutdown()
+
+        done = sum(1 for r in results if r)
+        rejected = results.count(None)
+        rate = done / elapsed if elapsed else 0.0
+        per_login = 1000 * elapsed / done if done else float("nan")
+        self.stdout.write(f"{iterations:>12} {rate:>10.1f} {per_login:>10.2f} {rejected:>9}")
@@ -0,0 +1,22 @@
+from django.http import JsonResponse
+from .hashing import HashingPoolSaturated
+
+
+class HashingPoolSaturatedMiddleware:
+    # Answers 429 when the password hashing pool is full, whether the
+    # error came from a DRF view, the admin login or any other auth path
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingPoolSaturated):
+            return None
+        response = JsonResponse(
+            {"detail": "Too many authentication requests, please retry shortly."},
+            status=429,
+        )
+        response["Retry-After"] = str(exception.retry_after)
+        return response
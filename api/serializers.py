@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 from .models import Note
+from .hashing import hash_password
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,7 +9,12 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "password"]
         extra_kwargs = {"password": {"write_only": True}}
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
+        # Hash in the shared pool instead of letting create_user do it inline,
+        # before the insert so a full pool doesn't leave a passwordless user
+        encoded = hash_password(validated_data.pop("password"))
+        user = User.objects.create_user(password=None, **validated_data)
+        user.password = encoded
+        user.save(update_fields=["password"])
         return user
 
 class NoteSerializer(serializers.ModelSerializer):
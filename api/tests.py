@@ -1,3 +1,107 @@
-from django.test import TestCase
+import threading
+from unittest import mock
+from django.contrib.auth.hashers import MD5PasswordHasher, make_password
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from . import hashing
 
-# Create your tests here.
+# Fast hasher so the tests don't spend their time in PBKDF2
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class LegacyMD5PasswordHasher(MD5PasswordHasher):
+    # Stands in for a hasher the project has moved away from
+    algorithm = "legacy_md5"
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class HashingPoolTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(username="alice", password="s3cret-pass")
+
+    def saturated(self):
+        # A pool with no free slots rejects every job
+        pool = hashing.HashingPool(workers=1, queue_depth=0)
+        pool.slots = threading.BoundedSemaphore(1)
+        pool.slots.acquire()
+        return mock.patch.object(hashing, "_pool", pool)
+
+    def test_token_login(self):
+        response = self.client.post("/api/token/", {"username": "alice", "password": "s3cret-pass"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.json())
+
+        response = self.client.post("/api/token/", {"username": "alice", "password": "wrong"})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(PASSWORD_HASHERS=FAST_HASHERS + ["api.tests.LegacyMD5PasswordHasher"])
+    def test_login_rehashes_with_default_hasher(self):
+        User.objects.filter(username="alice").update(password=make_password("s3cret-pass", hasher="legacy_md5"))
+        response = self.client.post("/api/token/", {"username": "alice", "password": "s3cret-pass"})
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(username="alice")
+        self.assertTrue(user.password.startswith("md5$"))
+        self.assertTrue(user.check_password("s3cret-pass"))
+
+    def test_saturated_token_login_is_429(self):
+        with self.saturated():
+            response = self.client.post("/api/token/", {"username": "alice", "password": "s3cret-pass"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_saturated_admin_login_is_429(self):
+        with self.saturated():
+            response = self.client.post("/admin/login/", {"username": "alice", "password": "s3cret-pass"})
+        self.assertEqual(response.status_code, 429)
+
+    def test_register_goes_through_create_user(self):
+        with mock.patch.object(User, "normalize_username", wraps=User.normalize_username) as normalize:
+            response = self.client.post("/api/user/register/", {"username": "bob", "password": "an0ther-pass"})
+        self.assertEqual(response.status_code, 201)
+        normalize.assert_called()
+        self.assertTrue(User.objects.get(username="bob").check_password("an0ther-pass"))
+
+    def test_saturated_register_is_429(self):
+        with self.saturated():
+            response = self.client.post("/api/user/register/", {"username": "bob", "password": "an0ther-pass"})
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(username="bob").exists())
+
+
+class DebugViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username="root", password=None, is_staff=True)
+        self.player = User.objects.create_user(username="alice", password=None)
+
+    def test_admin_only(self):
+        for url in ("/api/debug/profile/?seconds=0.1", "/api/debug/loop-lag/", "/api/debug/heartbeat/"):
+            self.assertEqual(self.client.get(url).status_code, 401, url)
+            self.client.force_authenticate(self.player)
+            self.assertEqual(self.client.get(url).status_code, 403, url)
+            self.client.force_authenticate(self.admin)
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+            self.client.force_authenticate(None)
+
+    def test_profile_returns_folded_stacks(self):
+        # Something to sample besides the request thread
+        done = threading.Event()
+        worker = threading.Thread(target=done.wait, name="worker")
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(done.set)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/debug/profile/?seconds=0.1")
+        self.assertEqual(response["Content-Type"], "text/plain")
+        self.assertRegex(response.content.decode(), r"(?m)^worker;.*wait \(.*\) \d+$")
+
+    def test_profile_rejects_bad_seconds(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get("/api/debug/profile/?seconds=soon").status_code, 400)
+
+    def test_stats(self):
+        self.client.force_authenticate(self.admin)
+        self.assertIn("loop_lag", self.client.get("/api/debug/loop-lag/").json())
+        self.assertEqual(set(self.client.get("/api/debug/heartbeat/").json()), {"connections", "reaped"})
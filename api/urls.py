@@ -5,4 +5,7 @@ urlpatterns = [
     path('games/result/', views.game_result, name='game_result'),
     path("notes/", views.NoteListCreate.as_view(), name="note-list"),
     path("notes/delete/<int:pk>", views.NoteDelete.as_view(), name="delete-note"),
+    path("debug/profile/", views.profile_process, name="debug-profile"),
+    path("debug/loop-lag/", views.loop_lag, name="debug-loop-lag"),
+    path("debug/heartbeat/", views.heartbeat_stats, name="debug-heartbeat"),
 ]
\ No newline at end of file
@@ -42,6 +42,12 @@ class CreatUserView(generics.CreateAPIView):
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.decorators import permission_classes
+from rest_framework.permissions import IsAdminUser
+from django.conf import settings
+from django.http import HttpResponse
+from drari_m3asbin.monitoring import loop_lag_stats, sample_stacks
+from drari_m3asbin.heartbeat import get_scheduler
 
 @api_view(['POST'])
 def game_result(request):
@@ -69,3 +75,26 @@ def game_result(request):
             {'error': str(e)}, 
             status=status.HTTP_400_BAD_REQUEST
         )
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_process(request):
+    # Samples the live process for ?seconds=N and returns folded stacks
+    # that flamegraph.pl or speedscope can render directly.
+    try:
+        seconds = float(request.query_params.get('seconds', 5))
+    except ValueError:
+        return Response({'error': 'seconds must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    seconds = min(max(seconds, 0.1), settings.PROFILE_MAX_SECONDS)
+    return HttpResponse(sample_stacks(seconds), content_type='text/plain')
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def loop_lag(request):
+    return Response({'loop_lag': loop_lag_stats()})
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def heartbeat_stats(request):
+    # Live sockets and how many dead ones were reaped, per consumer
+    return Response(get_scheduler().stats())
@@ -3,19 +3,25 @@ from channels.routing import ProtocolTypeRouter, URLRouter # type: ignore
 from django.core.asgi import get_asgi_application # type: ignore
 from channels.auth import AuthMiddlewareStack # type: ignore
 import drari_m3asbin.routing
+from drari_m3asbin.lifecycle import install_shutdown_hook
+from drari_m3asbin.monitoring import LoopLagMiddleware
+from drari_m3asbin.frontend import FrontendMiddleware
 from channels.layers import get_channel_layer
 import asyncio
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'drari_m3asbin.settings')
 
-application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+application = LoopLagMiddleware(ProtocolTypeRouter({
+    "http": FrontendMiddleware(get_asgi_application()),
     "websocket": AuthMiddlewareStack(
         URLRouter(
             drari_m3asbin.routing.websocket_urlpatterns
         )
     ),
-})
+}))
+
+# Snapshot live rooms and ask clients to reconnect when daphne stops
+install_shutdown_hook()
 
 # Add error handling for WebSocket connections
 async def send_to_group(group_name, message):
@@ -1,12 +1,20 @@
 import asyncio
 import logging
+import time
 import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.conf import settings
 import json
+from .lifecycle import RESTART_CLOSE_CODE, is_draining
+from .snapshots import restore_room
+from .heartbeat import get_scheduler
+from .timerwheel import get_wheel
+from . import movelog
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -31,6 +39,14 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
         
         # Accept the connection
         await self.accept()
+
+        # Worker is shutting down, send the client to another one
+        if is_draining():
+            await self.server_restart({})
+            return
+
+        heartbeat = get_scheduler()
+        heartbeat.register(self)
         
         # Add user to waiting players
         player_info = {
@@ -38,10 +54,18 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
             'channel_name': self.channel_name
         }
         
-        # Check if there are any waiting players
-        if WAITING_PLAYERS:
-            # Match found - get the first waiting player
-            opponent = WAITING_PLAYERS.pop(0)
+        # Get the first waiting player, dropping any whose connection went
+        # quiet so we never match against a half-open socket
+        opponent = None
+        while WAITING_PLAYERS:
+            candidate = WAITING_PLAYERS.pop(0)
+            if heartbeat.is_alive(candidate['channel_name']):
+                opponent = candidate
+                break
+            await heartbeat.reap(candidate['channel_name'])
+
+        if opponent:
+            # Match found
             
             # Create a unique room ID
             room_id = str(uuid.uuid4())[:8]
@@ -71,17 +95,26 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
             }))
     
     async def disconnect(self, close_code):
+        get_scheduler().unregister(self)
         # Remove from waiting queue if disconnected
         for i, player in enumerate(WAITING_PLAYERS):
             if player['username'] == self.username:
                 WAITING_PLAYERS.pop(i)
                 break
+
+    async def reap(self):
+        # Called by the heartbeat scheduler when the client stopped answering
+        WAITING_PLAYERS[:] = [p for p in WAITING_PLAYERS if p['channel_name'] != self.channel_name]
+        await self.close()
     
     async def receive(self, text_data):
+        get_scheduler().touch(self)
         data = json.loads(text_data)
         message_type = data.get('type')
         
-        if message_type == 'cancel_matchmaking':
+        if message_type == 'pong':
+            return
+        elif message_type == 'cancel_matchmaking':
             # Remove from waiting queue
             for i, player in enumerate(WAITING_PLAYERS):
                 if player['username'] == self.username:
@@ -99,6 +132,13 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
             'room': event['room'],
             'opponent': event['opponent']
         }))
+
+    async def server_restart(self, event):
+        await self.send(json.dumps({
+            'type': 'reconnect',
+            'message': 'Server restarting, please reconnect'
+        }))
+        await self.close(code=RESTART_CLOSE_CODE)
     
     @database_sync_to_async
     def get_user(self, username):
@@ -111,11 +151,138 @@ class MatchmakingConsumer(AsyncWebsocketConsumer):
 
 GAME_ROOMS = {}
 
+# Armed turn clock per room. Kept apart from GAME_ROOMS so rooms stay
+# plain data for snapshots; clocks are re-armed when players come back.
+TURN_TIMERS = {}
+
+# Armed per room restored from a snapshot until both players are back
+RECONNECT_TIMERS = {}
+
+
+def stop_turn_clock(room_id):
+    timer = TURN_TIMERS.pop(room_id, None)
+    if timer:
+        get_wheel().cancel(timer)
+
+
+def start_turn_clock(room_id):
+    stop_turn_clock(room_id)
+    game = GAME_ROOMS.get(room_id)
+    if not game or game['game_over'] or len(game['players']) < 2:
+        return
+    # Whichever runs out first: the per-turn limit or the player's total clock
+    limit = settings.TURN_TIMEOUT or None
+    clocks = game.get('clocks')
+    if clocks is not None:
+        remaining = clocks.get(game['current_turn'], 0)
+        limit = remaining if limit is None else min(limit, remaining)
+    if limit is None:
+        return
+    game['turn_started'] = time.time()
+    TURN_TIMERS[room_id] = get_wheel().schedule(limit, turn_timed_out, room_id, game['current_turn'])
+
+
+def charge_turn_clock(game, username):
+    clocks = game.get('clocks')
+    if clocks is None or 'turn_started' not in game:
+        return
+    spent = time.time() - game['turn_started']
+    clocks[username] = max(0.0, clocks.get(username, 0) - spent)
+
+
+async def turn_timed_out(room_id, username):
+    TURN_TIMERS.pop(room_id, None)
+    game = GAME_ROOMS.get(room_id)
+    if not game or game['game_over'] or game['current_turn'] != username or is_draining():
+        return
+
+    # The player who ran out of time forfeits
+    charge_turn_clock(game, username)
+    winner = next((p for p in game['players'] if p['username'] != username), None)
+    game['winner'] = winner['username'] if winner else None
+    game['game_over'] = True
+    game['seq'] += 1
+    movelog.log_result(room_id, game['game_id'], game['seq'], winner['symbol'] if winner else None)
+
+    await get_channel_layer().group_send(
+        f'game_{room_id}',
+        {
+            'type': 'update_game_state',
+            'board': game['board'],
+            'current_turn': game['current_turn'],
+            'game_over': game['game_over'],
+            'winner': game['winner']
+        }
+    )
+
+
+def stop_reconnect_clock(room_id):
+    timer = RECONNECT_TIMERS.pop(room_id, None)
+    if timer:
+        get_wheel().cancel(timer)
+
+
+def delete_room(room_id):
+    stop_turn_clock(room_id)
+    stop_reconnect_clock(room_id)
+    GAME_ROOMS.pop(room_id, None)
+
+
+async def reconnect_timed_out(room_id):
+    RECONNECT_TIMERS.pop(room_id, None)
+    game = GAME_ROOMS.get(room_id)
+    if not game or is_draining():
+        return
+
+    present = [p for p in game['players'] if p.get('channel_name')]
+    absent = [p for p in game['players'] if not p.get('channel_name')]
+    if not present:
+        # Nobody came back after the restart
+        delete_room(room_id)
+        return
+    if not absent:
+        return
+
+    # Free the seats that were never reclaimed; the player who came back wins
+    game['players'] = present
+    stop_turn_clock(room_id)
+    channel_layer = get_channel_layer()
+    if not game['game_over']:
+        winner = present[0]
+        game['winner'] = winner['username']
+        game['game_over'] = True
+        game['seq'] += 1
+        movelog.log_result(room_id, game['game_id'], game['seq'], winner['symbol'])
+        await channel_layer.group_send(
+            f'game_{room_id}',
+            {
+                'type': 'update_game_state',
+                'board': game['board'],
+                'current_turn': game['current_turn'],
+                'game_over': game['game_over'],
+                'winner': game['winner']
+            }
+        )
+    for player in absent:
+        await channel_layer.group_send(
+            f'game_{room_id}',
+            {
+                'type': 'player_left',
+                'username': player['username']
+            }
+        )
+
+
 class TicTacToeConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.username = self.scope['url_route']['kwargs'].get('username')
         self.room_group_name = f'game_{self.room_id}'
+
+        # Room ids have to fit the move log's fixed-width field
+        if not movelog.valid_room_id(self.room_id):
+            await self.close()
+            return
         
         # Join room group
         await self.channel_layer.group_add(
@@ -124,16 +291,36 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+
+        # Worker is shutting down, no new rooms or seats here
+        if is_draining():
+            await self.server_restart({})
+            return
+
+        get_scheduler().register(self)
         
+        # Bring the room back from the last shutdown snapshot, if any
+        if self.room_id not in GAME_ROOMS:
+            restored = restore_room(self.room_id)
+            if restored:
+                GAME_ROOMS[self.room_id] = restored
+                RECONNECT_TIMERS[self.room_id] = get_wheel().schedule(
+                    settings.RECONNECT_TIMEOUT, reconnect_timed_out, self.room_id
+                )
+
         # Initialize game if it doesn't exist
         if self.room_id not in GAME_ROOMS:
             GAME_ROOMS[self.room_id] = {
                 'board': [None] * 9,
+                'game_id': movelog.new_game_id(),
+                'seq': 0,
                 'players': [],
                 'current_turn': None,
                 'game_over': False,
                 'winner': None
             }
+            if settings.GAME_CLOCK:
+                GAME_ROOMS[self.room_id]['clocks'] = {}
         
         # Add player to the game
         game = GAME_ROOMS[self.room_id]
@@ -145,10 +332,17 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
                 'symbol': symbol,
                 'channel_name': self.channel_name
             })
+            if 'clocks' in game:
+                game['clocks'][self.username] = settings.GAME_CLOCK
             
             # Set current turn if this is the first player
             if len(game['players']) == 1:
                 game['current_turn'] = self.username
+        elif self.username:
+            # Reconnecting player, e.g. after a restart
+            for player in game['players']:
+                if player['username'] == self.username:
+                    player['channel_name'] = self.channel_name
         
         # Send current game state
         await self.send(json.dumps({
@@ -160,8 +354,11 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
             'winner': game['winner']
         }))
         
-        # Notify all clients if both players are connected
-        if len(game['players']) == 2:
+        # Notify all clients if both players are connected. Seats restored
+        # from a snapshot have no channel until their player comes back.
+        connected = [p for p in game['players'] if p.get('channel_name')]
+        if len(connected) == 2:
+            stop_reconnect_clock(self.room_id)
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
@@ -169,15 +366,38 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
                     'players': [{'username': p['username'], 'symbol': p['symbol']} for p in game['players']]
                 }
             )
+            if self.room_id not in TURN_TIMERS:
+                start_turn_clock(self.room_id)
     
     async def disconnect(self, close_code):
-        # Remove player from game
-        if self.room_id in GAME_ROOMS:
+        get_scheduler().unregister(self)
+        await self.leave_room()
+        
+        # Leave room group
+        await self.channel_layer.group_discard(
+            self.room_group_name,
+            self.channel_name
+        )
+
+    async def reap(self):
+        # Called by the heartbeat scheduler; free the seat right away since
+        # the disconnect of a half-open socket can take a long time to come
+        await self.leave_room()
+        await self.close()
+
+    async def leave_room(self):
+        if getattr(self, 'left_room', False):
+            return
+        self.left_room = True
+        # Remove player from game, unless the room is being kept for a restart
+        if self.room_id in GAME_ROOMS and not is_draining():
             game = GAME_ROOMS[self.room_id]
             game['players'] = [p for p in game['players'] if p['username'] != self.username]
+            stop_turn_clock(self.room_id)
             
-            # Notify remaining player that opponent left
-            if game['players']:
+            # Notify remaining player that opponent left. Seats restored
+            # from a snapshot don't count until their player is back.
+            if any(p.get('channel_name') for p in game['players']):
                 await self.channel_layer.group_send(
                     self.room_group_name,
                     {
@@ -187,24 +407,21 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
                 )
             else:
                 # Clean up if no players left
-                del GAME_ROOMS[self.room_id]
-        
-        # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+                delete_room(self.room_id)
     
     async def receive(self, text_data):
+        get_scheduler().touch(self)
         data = json.loads(text_data)
         message_type = data.get('type')
         
-        if message_type == 'make_move':
-            print(f"Received move from {self.username}: {data}")
+        if message_type == 'pong':
+            return
+        elif message_type == 'make_move':
+            logger.debug("Received move from %s: %s", self.username, data)
             # Handle move
             await self.make_move(data)
         elif message_type == 'game_over':
-            print(f"Game over from {self.username}: {data}")
+            logger.debug("Game over from %s: %s", self.username, data)
             # Handle game over
             result = data.get('result')
             if result:
@@ -212,7 +429,8 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
     
     async def make_move(self, data):
         game = GAME_ROOMS.get(self.room_id)
-        if not game:
+        # The room is frozen for the snapshot while the worker drains
+        if not game or is_draining():
             return
         
         # Check if it's the player's turn and game is not over
@@ -230,17 +448,26 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
         
         # Make the move
         game['board'][position] = player['symbol']
+        game['seq'] += 1
+        movelog.log_move(self.room_id, game['game_id'], game['seq'], position, player['symbol'])
         
         # Check for win or draw
         winner, game_over = self.check_game_state(game['board'])
         game['winner'] = winner
         game['game_over'] = game_over
+        if game_over:
+            game['seq'] += 1
+            movelog.log_result(self.room_id, game['game_id'], game['seq'], player['symbol'] if winner else None)
         
         # Switch turns if game is not over
+        charge_turn_clock(game, self.username)
         if not game_over:
             other_player = next((p for p in game['players'] if p['username'] != self.username), None)
             if other_player:
                 game['current_turn'] = other_player['username']
+            start_turn_clock(self.room_id)
+        else:
+            stop_turn_clock(self.room_id)
         
         # Broadcast updated game state
         await self.channel_layer.group_send(
@@ -276,11 +503,13 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
     
     async def restart_game(self):
         game = GAME_ROOMS.get(self.room_id)
-        if not game:
+        if not game or is_draining():
             return
         
         # Reset the game state
         game['board'] = [None] * 9
+        game['game_id'] = movelog.new_game_id()
+        game['seq'] = 0
         game['game_over'] = False
         game['winner'] = None
         
@@ -294,6 +523,10 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
                 player['symbol'] = 'O' if player['symbol'] == 'X' else 'X'
             
             game['current_turn'] = new_starter
+
+        if 'clocks' in game:
+            game['clocks'] = {p['username']: settings.GAME_CLOCK for p in game['players']}
+        start_turn_clock(self.room_id)
         
         # Broadcast restarted game state
         await self.channel_layer.group_send(
@@ -329,6 +562,13 @@ class TicTacToeConsumer(AsyncWebsocketConsumer):
             'username': event['username']
         }))
 
+    async def server_restart(self, event):
+        await self.send(json.dumps({
+            'type': 'reconnect',
+            'message': 'Server restarting, please reconnect'
+        }))
+        await self.close(code=RESTART_CLOSE_CODE)
+
     async def end_game(self, result, user):
         await self.send(json.dumps({
                 'type': 'game_over',
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import re
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = b'public, max-age=31536000, immutable'
+REVALIDATE = b'no-cache'
+CHUNK_SIZE = 256 * 1024
+# Precompressed siblings written at build time, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+ETAG_RE = re.compile(rb'(?:W/)?("[^"]*")')
+
+
+class StaticFile:
+    __slots__ = ('path', 'size', 'etag', 'content_type', 'cache_control', 'variants')
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        tag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+        self.etag = f'"{tag}"'.encode()
+        content_type, _ = mimetypes.guess_type(path)
+        self.content_type = (content_type or 'application/octet-stream').encode()
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+        # Each encoding is a different body, so it gets its own ETag
+        self.variants = {}
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                etag = f'"{tag}{ETAG_SUFFIXES[encoding]}"'.encode()
+                self.variants[encoding] = (path + suffix, os.path.getsize(path + suffix), etag)
+
+
+def _scan(root, prefix, is_immutable):
+    # url path -> StaticFile, built once so requests never touch the disk
+    # for lookups; a new build ships with a restart anyway
+    files = {}
+    if not root or not os.path.isdir(root):
+        return files
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                continue
+            path = os.path.join(dirpath, filename)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[prefix + relative] = StaticFile(path, is_immutable(relative))
+    return files
+
+
+def _manifest_paths(static_root):
+    # Hashed names written by ManifestStaticFilesStorage
+    try:
+        with open(os.path.join(static_root, 'staticfiles.json')) as f:
+            return set(json.load(f).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def _etag_matches(if_none_match, etag):
+    # If-None-Match uses weak comparison: W/ is ignored, * matches anything
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == b'*':
+        return True
+    return etag in ETAG_RE.findall(if_none_match)
+
+
+class FrontendMiddleware:
+    # Serves the built Vite bundle and collected static files straight from
+    # the ASGI app, and lets everything else through to Django. Hashed
+    # files get immutable caching, the rest revalidates through ETags.
+
+    def __init__(self, app):
+        self.app = app
+        # Scanned here, at import time, so no request ever waits on the disk
+        self.load()
+
+    def load(self):
+        dist = settings.FRONTEND_DIST_DIR
+        self.files = _scan(dist, '/', lambda name: name.startswith('assets/'))
+        if settings.STATIC_ROOT:
+            hashed = _manifest_paths(settings.STATIC_ROOT)
+            static_url = '/' + settings.STATIC_URL.strip('/') + '/'
+            self.files.update(_scan(settings.STATIC_ROOT, static_url, hashed.__contains__))
+        self.index = self.files.get('/index.html')
+        logger.info("Serving %d frontend and static files", len(self.files))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            return await self.app(scope, receive, send)
+
+        path = scope['path']
+        static = self.files.get(path)
+        if static is None and self.wants_spa(scope):
+            static = self.index
+        if static is None:
+            return await self.app(scope, receive, send)
+        await self.serve(scope, send, static)
+
+    def wants_spa(self, scope):
+        # Client-side routes fall back to index.html, backend routes never do
+        if self.index is None:
+            return False
+        path = scope['path']
+        if path.startswith(settings.FRONTEND_BACKEND_PREFIXES):
+            return False
+        return b'text/html' in dict(scope['headers']).get(b'accept', b'')
+
+    async def serve(self, scope, send, static):
+        headers = dict(scope['headers'])
+        response_headers = [
+            (b'content-type', static.content_type),
+            (b'cache-control', static.cache_control),
+        ]
+        if static.variants:
+            response_headers.append((b'vary', b'Accept-Encoding'))
+
+        path, size, etag = static.path, static.size, static.etag
+        accepted = headers.get(b'accept-encoding', b'').decode('latin-1')
+        accepted = {token.split(';')[0].strip() for token in accepted.split(',')}
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in static.variants:
+                path, size, etag = static.variants[encoding]
+                response_headers.append((b'content-encoding', encoding.encode()))
+                break
+        response_headers.append((b'etag', etag))
+
+        if _etag_matches(headers.get(b'if-none-match'), etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': response_headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        response_headers.append((b'content-length', str(size).encode()))
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+        if scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await self.send_file(scope, send, path, size)
+
+    async def send_file(self, scope, send, path, size):
+        extensions = scope.get('extensions') or {}
+        # Let the server hand the file to the kernel when it can
+        if 'http.response.pathsend' in extensions:
+            await send({'type': 'http.response.pathsend', 'path': path})
+            return
+        if 'http.response.zerocopysend' in extensions:
+            with open(path, 'rb') as f:
+                await send({'type': 'http.response.zerocopysend', 'file': f.fileno(), 'count': size})
+            return
+
+        loop = asyncio.get_running_loop()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    break
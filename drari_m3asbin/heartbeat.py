@@ -0,0 +1,91 @@
+import asyncio
+import collections
+import json
+import logging
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PING = json.dumps({'type': 'ping'})
+
+
+class HeartbeatScheduler:
+    # One task per worker pings every registered socket each `interval`
+    # seconds. Any message from the client counts as a pong; sockets that
+    # stay quiet for `timeout` seconds are reaped through consumer.reap().
+
+    def __init__(self, interval, timeout):
+        self.interval = interval
+        self.timeout = timeout
+        self.consumers = {}
+        self.last_seen = {}
+        self.reaped = collections.Counter()
+        self.task = None
+
+    def register(self, consumer):
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        self.consumers[consumer.channel_name] = consumer
+        self.last_seen[consumer.channel_name] = time.monotonic()
+
+    def unregister(self, consumer):
+        self.consumers.pop(consumer.channel_name, None)
+        self.last_seen.pop(consumer.channel_name, None)
+
+    def touch(self, consumer):
+        if consumer.channel_name in self.last_seen:
+            self.last_seen[consumer.channel_name] = time.monotonic()
+
+    def is_alive(self, channel_name):
+        last_seen = self.last_seen.get(channel_name)
+        return last_seen is not None and time.monotonic() - last_seen <= self.timeout
+
+    async def reap(self, channel_name):
+        consumer = self.consumers.pop(channel_name, None)
+        self.last_seen.pop(channel_name, None)
+        if consumer is None:
+            return
+        self.reaped[type(consumer).__name__] += 1
+        try:
+            await consumer.reap()
+        except Exception as e:
+            logger.warning("Error reaping %s: %s", channel_name, e)
+
+    async def _ping(self, channel_name, consumer):
+        try:
+            await consumer.send(PING)
+        except Exception:
+            await self.reap(channel_name)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            deadline = time.monotonic() - self.timeout
+            dead = [name for name, seen in self.last_seen.items() if seen < deadline]
+            for channel_name in dead:
+                await self.reap(channel_name)
+            if dead:
+                logger.info("Reaped %d dead connections", len(dead))
+            await asyncio.gather(*(
+                self._ping(name, consumer) for name, consumer in list(self.consumers.items())
+            ))
+
+    def stats(self):
+        return {
+            'connections': len(self.consumers),
+            'reaped': dict(self.reaped),
+        }
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = HeartbeatScheduler(
+            getattr(settings, 'HEARTBEAT_INTERVAL', 15),
+            getattr(settings, 'HEARTBEAT_TIMEOUT', 45),
+        )
+    return _scheduler
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import signal
+import sys
+from channels.layers import get_channel_layer
+from django.conf import settings
+from . import movelog
+from .snapshots import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Close code telling clients the worker restarts and they should reconnect.
+# Daphne only accepts 1000 or 3000-4999, so 1012 is mirrored as 4012.
+RESTART_CLOSE_CODE = 4012
+
+_draining = False
+
+
+def is_draining():
+    return _draining
+
+
+async def drain():
+    # Stop matchmaking and moves, tell every client to come back, then save
+    # the rooms. Consumers ignore moves once _draining is set, so the
+    # snapshot taken after the last await is what clients come back to.
+    global _draining
+    if _draining:
+        return
+    _draining = True
+
+    from .consumers import GAME_ROOMS, WAITING_PLAYERS
+
+    channel_layer = get_channel_layer()
+    waiting = list(WAITING_PLAYERS)
+    WAITING_PLAYERS.clear()
+    for player in waiting:
+        await channel_layer.send(player['channel_name'], {'type': 'server_restart'})
+    for room_id in list(GAME_ROOMS):
+        await channel_layer.group_send(f'game_{room_id}', {'type': 'server_restart'})
+
+    # Give consumers a moment to push the reconnect message out
+    await asyncio.sleep(getattr(settings, 'DRAIN_GRACE_PERIOD', 1.0))
+
+    try:
+        write_snapshot(GAME_ROOMS)
+    except OSError as e:
+        logger.error("Could not snapshot rooms: %s", e)
+    try:
+        await movelog.flush()
+    except OSError as e:
+        logger.error("Could not flush move log: %s", e)
+
+
+def install_shutdown_hook():
+    # Daphne runs on twisted's asyncio reactor. Its own shutdown trigger
+    # cancels every consumer straight away, so SIGTERM/SIGINT are taken
+    # over instead: drain while the consumers are still alive, then stop
+    # the reactor. A second signal stops it right away. Other servers are
+    # left alone.
+    reactor = sys.modules.get('twisted.internet.reactor')
+    if reactor is None:
+        return
+    from twisted.internet.defer import Deferred # type: ignore
+
+    def stop(_=None):
+        if reactor.running:
+            reactor.stop()
+
+    def begin_drain():
+        if _draining:
+            stop()
+            return
+        Deferred.fromFuture(asyncio.ensure_future(drain())).addBoth(stop)
+
+    def on_signal(signum, frame):
+        reactor.callFromThread(begin_drain)
+
+    def install():
+        # Twisted installs its handlers as the reactor starts; replace them
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+
+    reactor.callWhenRunning(install)
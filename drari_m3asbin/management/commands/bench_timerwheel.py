@@ -0,0 +1,84 @@
+import asyncio
+import random
+import time
+from django.core.management.base import BaseCommand
+from drari_m3asbin.timerwheel import TimerWheel
+
+
+def noop(*args):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark turn clock arm/cancel on the timer wheel against asyncio timer handles"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=100_000)
+        parser.add_argument("--moves", type=int, default=5, help="re-arms per room")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--tick", type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        rooms = options["rooms"]
+        self.stdout.write(f"{rooms} rooms, {options['moves']} moves each, {options['timeout']}s turn clock")
+        self.stdout.write(f"{'':>14} {'arm ns':>10} {'move ns':>10} {'cancel ns':>10}")
+        self.report("timer wheel", self.bench_wheel(options))
+        self.report("asyncio", asyncio.run(self.bench_asyncio(options)))
+
+    def report(self, name, timings):
+        self.stdout.write(f"{name:>14} " + " ".join(f"{t:>10.0f}" for t in timings))
+
+    def delays(self, options):
+        # Spread deadlines a little, as real turns don't all start together
+        timeout = options["timeout"]
+        return [timeout * random.uniform(0.5, 1.0) for _ in range(options["rooms"])]
+
+    def bench_wheel(self, options):
+        wheel = TimerWheel(tick=options["tick"])
+        delays = self.delays(options)
+        rooms = options["rooms"]
+
+        start = time.perf_counter_ns()
+        timers = [wheel.schedule(delay, noop, room) for room, delay in enumerate(delays)]
+        arm = (time.perf_counter_ns() - start) / rooms
+
+        # A move cancels the mover's clock and arms the opponent's; the
+        # wheel keeps ticking in between like it does on a live worker
+        start = time.perf_counter_ns()
+        for _ in range(options["moves"]):
+            for room, delay in enumerate(delays):
+                wheel.cancel(timers[room])
+                timers[room] = wheel.schedule(delay, noop, room)
+            wheel.advance()
+        move = (time.perf_counter_ns() - start) / (rooms * options["moves"])
+
+        start = time.perf_counter_ns()
+        for timer in timers:
+            wheel.cancel(timer)
+        cancel = (time.perf_counter_ns() - start) / rooms
+        return arm, move, cancel
+
+    async def bench_asyncio(self, options):
+        loop = asyncio.get_running_loop()
+        delays = self.delays(options)
+        rooms = options["rooms"]
+
+        start = time.perf_counter_ns()
+        handles = [loop.call_later(delay, noop, room) for room, delay in enumerate(delays)]
+        arm = (time.perf_counter_ns() - start) / rooms
+
+        start = time.perf_counter_ns()
+        for _ in range(options["moves"]):
+            for room, delay in enumerate(delays):
+                handles[room].cancel()
+                handles[room] = loop.call_later(delay, noop, room)
+            # Let the loop run so it purges cancelled handles from its heap
+            await asyncio.sleep(0)
+        move = (time.perf_counter_ns() - start) / (rooms * options["moves"])
+
+        start = time.perf_counter_ns()
+        for handle in handles:
+            handle.cancel()
+        cancel = (time.perf_counter_ns() - start) / rooms
+        await asyncio.sleep(0)
+        return arm, move, cancel
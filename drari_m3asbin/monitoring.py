@@ -0,0 +1,129 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from channels.consumer import AsyncConsumer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _handler_name(frame):
+    # Innermost consumer method on the stack, e.g. "TicTacToeConsumer.end_game"
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if isinstance(owner, AsyncConsumer):
+            return f'{type(owner).__name__}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _collapse(frame):
+    # One stack in flamegraph "folded" form: root;...;leaf
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class LoopLagMonitor:
+    # A coroutine on the loop bumps a heartbeat every `interval`; a watchdog
+    # thread notices when the heartbeat stops and grabs the loop thread's
+    # stack while the blocking callback is still running.
+
+    def __init__(self, interval, threshold):
+        self.interval = interval
+        self.threshold = threshold
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_beat = time.monotonic()
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+
+    def start(self, loop):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        loop.create_task(self._probe())
+        threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True).start()
+
+    async def _probe(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_beat = now
+            lag = now - expected
+            # Stalls are reported by the watchdog, with the blocking stack
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def _watch(self):
+        reported = None
+        while True:
+            time.sleep(self.interval)
+            beat = self.last_beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled <= self.threshold or reported == beat:
+                continue
+            # Report each stall once, while it is still happening
+            reported = beat
+            self.slow_callbacks += 1
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            logger.warning(
+                "Event loop blocked for %.0f ms in %s\n%s",
+                stalled * 1000,
+                _handler_name(frame) or 'unknown handler',
+                ''.join(traceback.format_stack(frame)),
+            )
+
+
+_monitor = None
+
+
+class LoopLagMiddleware:
+    # Starts the monitor from inside the running loop on the first connection
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _monitor
+        if _monitor is None and getattr(settings, 'LOOP_LAG_MONITOR', True):
+            _monitor = LoopLagMonitor(
+                getattr(settings, 'LOOP_LAG_INTERVAL', 0.1),
+                getattr(settings, 'LOOP_LAG_THRESHOLD', 0.1),
+            )
+            _monitor.start(asyncio.get_running_loop())
+        return await self.app(scope, receive, send)
+
+
+def loop_lag_stats():
+    if _monitor is None:
+        return None
+    return {
+        'max_lag_ms': round(_monitor.max_lag * 1000, 1),
+        'slow_callbacks': _monitor.slow_callbacks,
+    }
+
+
+def sample_stacks(seconds, interval=0.005):
+    # Samples every thread except the caller and returns folded stacks
+    # ("frame;frame;frame count" per line) for flamegraph.pl / speedscope.
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    counts = collections.Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            thread = names.get(thread_id, str(thread_id))
+            counts[f'{thread};{_collapse(frame)}'] += 1
+        time.sleep(interval)
+    return '\n'.join(f'{stack} {count}' for stack, count in counts.most_common()) + '\n'
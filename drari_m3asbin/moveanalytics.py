@@ -0,0 +1,92 @@
+import glob
+import os
+import numpy as np
+from .movelog import RECORD, RESULT_CELL, ROOM_ID_BYTES, SEGMENT_PREFIX, SEGMENT_SUFFIX
+
+# Offline readers for the move log segments; nothing here runs on the
+# game hot path.
+
+MOVE_DTYPE = np.dtype([
+    ('room', f'S{ROOM_ID_BYTES}'),
+    ('game', '<u8'),
+    ('seq', '<u4'),
+    ('cell', 'u1'),
+    ('symbol', 'S1'),
+    ('pad', 'V2'),
+    ('ts', '<f8'),
+])
+assert MOVE_DTYPE.itemsize == RECORD.size
+
+
+def read_segment(path):
+    # Memory-mapped view; a record cut short by a crash is ignored
+    count = os.path.getsize(path) // MOVE_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=MOVE_DTYPE)
+    return np.memmap(path, dtype=MOVE_DTYPE, mode='r', shape=(count,))
+
+
+def segment_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, f'{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}')))
+
+
+def load_moves(directory):
+    segments = [read_segment(path) for path in segment_paths(directory)]
+    if not segments:
+        return np.empty(0, dtype=MOVE_DTYPE)
+    return np.concatenate(segments)
+
+
+def replay(moves, room_id):
+    # Events of one room in play order, results included: games ordered
+    # by when they started, events within a game by seq
+    room = moves[moves['room'] == room_id.encode()]
+    if len(room) == 0:
+        return room
+    _, inverse = np.unique(room['game'], return_inverse=True)
+    started = np.full(inverse.max() + 1, np.inf)
+    np.minimum.at(started, inverse, room['ts'])
+    return room[np.lexsort((room['seq'], room['game'], started[inverse]))]
+
+
+def split_games(moves):
+    # Sorts by (game, seq) and gives every event the index of its game
+    moves = moves[np.lexsort((moves['seq'], moves['game']))]
+    if len(moves) == 0:
+        return moves, np.empty(0, dtype=np.intp)
+    starts = np.ones(len(moves), dtype=bool)
+    starts[1:] = moves['game'][1:] != moves['game'][:-1]
+    return moves, np.cumsum(starts) - 1
+
+
+def opening_win_rates(moves):
+    # Per opening cell, how often the player who opened went on to win
+    # or draw; unfinished games are left out.
+    moves, game = split_games(moves)
+    if len(moves) == 0:
+        return {}
+    n_games = game[-1] + 1
+    is_result = moves['cell'] == RESULT_CELL
+
+    first = np.flatnonzero(np.diff(game, prepend=-1))
+    opening = moves[first]
+
+    outcome = np.full(n_games, b'', dtype='S1')
+    outcome[game[is_result]] = moves['symbol'][is_result]
+
+    finished = (outcome != b'') & (opening['cell'] != RESULT_CELL)
+    cells = opening['cell'][finished].astype(np.intp)
+    wins = (opening['symbol'] == outcome)[finished]
+    draws = (outcome == b'-')[finished]
+
+    games = np.bincount(cells, minlength=9)
+    won = np.bincount(cells, weights=wins, minlength=9)
+    drawn = np.bincount(cells, weights=draws, minlength=9)
+    return {
+        cell: {
+            'games': int(games[cell]),
+            'win_rate': float(won[cell] / games[cell]),
+            'draw_rate': float(drawn[cell] / games[cell]),
+        }
+        for cell in range(9) if games[cell]
+    }
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+import uuid
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# One 40 byte little-endian record per event:
+#   room (16s, null padded) | game (u64) | seq (u32) | cell (u8) | symbol (1s) | pad (2) | ts (f64)
+# `game` is random per game, so a room id reused after its room was freed
+# never merges two games; seq counts events within the game. A cell of
+# RESULT_CELL marks the end of a game; its symbol is the winner's symbol,
+# or b'-' for a draw. moveanalytics.MOVE_DTYPE mirrors this layout.
+RECORD = struct.Struct('<16sQIBc2xd')
+ROOM_ID_BYTES = 16
+RESULT_CELL = 255
+DRAW = b'-'
+SEGMENT_PREFIX = 'moves-'
+SEGMENT_SUFFIX = '.bin'
+
+
+class MoveLogWriter:
+    # Moves are packed into an in-memory buffer on the event loop and
+    # written out from an executor thread, either every `flush_interval`
+    # seconds or as soon as the buffer grows past `buffer_bytes`.
+
+    def __init__(self, directory, segment_bytes, flush_interval, buffer_bytes=64 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.buffer_bytes = buffer_bytes
+        self.buffer = bytearray()
+        self.segment = None
+        self.segment_size = 0
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.flush_task = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def append(self, room_id, game_id, seq, cell, symbol):
+        room = room_id.encode()
+        if len(room) > ROOM_ID_BYTES:
+            raise ValueError(f"Room id {room_id!r} is longer than {ROOM_ID_BYTES} bytes")
+        self.buffer += RECORD.pack(room, game_id, seq, cell, symbol.encode(), time.time())
+        if len(self.buffer) >= self.buffer_bytes and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.get_running_loop().create_task(self._flush_logged())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_logged()
+
+    async def _flush_logged(self):
+        # Background flushes have nobody to raise to
+        try:
+            await self.flush()
+        except OSError as e:
+            logger.error("Could not write move log: %s", e)
+
+    async def flush(self):
+        async with self.lock:
+            if not self.buffer:
+                return
+            data, self.buffer = bytes(self.buffer), bytearray()
+            await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    def _write(self, data):
+        if self.segment is None or self.segment_size >= self.segment_bytes:
+            self._rotate()
+        self.segment.write(data)
+        self.segment.flush()
+        self.segment_size += len(data)
+
+    def _rotate(self):
+        if self.segment is not None:
+            self.segment.close()
+        name = f'{SEGMENT_PREFIX}{time.time_ns()}-{os.getpid()}{SEGMENT_SUFFIX}'
+        self.segment = open(os.path.join(self.directory, name), 'ab')
+        self.segment_size = 0
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = MoveLogWriter(
+            getattr(settings, 'MOVE_LOG_DIR', settings.BASE_DIR / 'movelog'),
+            getattr(settings, 'MOVE_LOG_SEGMENT_BYTES', 64 * 1024 * 1024),
+            getattr(settings, 'MOVE_LOG_FLUSH_INTERVAL', 1.0),
+        )
+        _writer.start()
+    return _writer
+
+
+def valid_room_id(room_id):
+    return len(room_id.encode()) <= ROOM_ID_BYTES
+
+
+def new_game_id():
+    return uuid.uuid4().int >> 64
+
+
+def log_move(room_id, game_id, seq, cell, symbol):
+    get_writer().append(room_id, game_id, seq, cell, symbol)
+
+
+def log_result(room_id, game_id, seq, winner_symbol):
+    get_writer().append(room_id, game_id, seq, RESULT_CELL, winner_symbol or DRAW.decode())
+
+
+async def flush():
+    if _writer is not None:
+        await _writer.flush()
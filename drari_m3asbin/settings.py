@@ -77,6 +77,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.HashingPoolSaturatedMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -135,12 +136,51 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing runs in a bounded pool (api/hashing.py); once the
+# workers and the queue are full, auth endpoints answer 429 right away.
+AUTHENTICATION_BACKENDS = [
+    'api.backends.PooledModelBackend',
+]
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '4'))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv('PASSWORD_HASH_QUEUE_DEPTH', '32'))
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels.layers.InMemoryChannelLayer",
     },
 }
 
+# Live rooms are written here on shutdown and restored lazily on first access
+ROOM_SNAPSHOT_PATH = Path(os.getenv('ROOM_SNAPSHOT_PATH', BASE_DIR / 'room_snapshot.jsonl'))
+DRAIN_GRACE_PERIOD = float(os.getenv('DRAIN_GRACE_PERIOD', '1.0'))
+# Seconds a snapshotted room is kept for its players, and how long a
+# restored room waits for the second player before it is forfeited
+ROOM_SNAPSHOT_TTL = float(os.getenv('ROOM_SNAPSHOT_TTL', '600'))
+RECONNECT_TIMEOUT = float(os.getenv('RECONNECT_TIMEOUT', '60'))
+
+# Websocket ping interval and how long a silent socket lives, in seconds
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', '15'))
+HEARTBEAT_TIMEOUT = float(os.getenv('HEARTBEAT_TIMEOUT', '45'))
+
+# Turn clocks in seconds. TURN_TIMEOUT limits each move (0 disables it),
+# GAME_CLOCK is an optional chess-style total per player. Both run on a
+# single timer wheel per worker ticking every TIMER_WHEEL_TICK seconds.
+TURN_TIMEOUT = float(os.getenv('TURN_TIMEOUT', '30'))
+GAME_CLOCK = float(os.getenv('GAME_CLOCK', '0')) or None
+TIMER_WHEEL_TICK = 0.1
+
+# Append-only binary move log, see drari_m3asbin/movelog.py
+MOVE_LOG_DIR = Path(os.getenv('MOVE_LOG_DIR', BASE_DIR / 'movelog'))
+MOVE_LOG_SEGMENT_BYTES = 64 * 1024 * 1024
+MOVE_LOG_FLUSH_INTERVAL = 1.0
+
+# Event loop lag probe (drari_m3asbin/monitoring.py), values in seconds
+LOOP_LAG_MONITOR = os.getenv('LOOP_LAG_MONITOR', '1') == '1'
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.1'))
+LOOP_LAG_THRESHOLD = float(os.getenv('LOOP_LAG_THRESHOLD', '0.1'))
+# Upper bound for /api/debug/profile/?seconds=N
+PROFILE_MAX_SECONDS = 30
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -157,6 +197,25 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    # Deployments run `python manage.py collectstatic` before starting;
+    # it writes content-hashed copies, served as immutable. Without it
+    # plain names are used, see drari_m3asbin/storage.py
+    "staticfiles": {
+        "BACKEND": "drari_m3asbin.storage.ManifestStaticStorage",
+    },
+}
+
+# Built Vite bundle (npm run build in my-app), served by the ASGI app
+# along with STATIC_ROOT; see drari_m3asbin/frontend.py
+FRONTEND_DIST_DIR = Path(os.getenv('FRONTEND_DIST_DIR', BASE_DIR / 'my-app' / 'dist'))
+# Paths that belong to Django and never fall back to the SPA's index.html
+FRONTEND_BACKEND_PREFIXES = ('/api/', '/api-auth/', '/admin/', '/ws/', '/' + STATIC_URL)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
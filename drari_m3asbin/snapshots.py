@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Snapshot format: one line per room, "<room_id>\t<saved at>\t<compact json>".
+# On startup nothing is parsed; the file is only split into lines the
+# first time a room is looked up, and each room's json is decoded when
+# that room is first accessed. Rooms older than ROOM_SNAPSHOT_TTL are
+# dropped, however many restarts they were carried through.
+
+_pending = None
+_pending_lock = threading.Lock()
+
+
+def snapshot_path():
+    return getattr(settings, 'ROOM_SNAPSHOT_PATH', settings.BASE_DIR / 'room_snapshot.jsonl')
+
+
+def _expired(saved_at):
+    return time.time() - saved_at > getattr(settings, 'ROOM_SNAPSHOT_TTL', 600)
+
+
+def _room_state(game):
+    # Channel names die with the worker, players get new ones on reconnect
+    state = dict(game)
+    state['players'] = [
+        {'username': p['username'], 'symbol': p['symbol']} for p in game['players']
+    ]
+    return state
+
+
+def write_snapshot(rooms):
+    # Rooms restored from the last snapshot that nobody came back to yet
+    # are carried over as-is, so back-to-back restarts don't drop them.
+    pending = _load_pending()
+    path = snapshot_path()
+    tmp = f'{path}.tmp'
+    now = time.time()
+    count = 0
+    with open(tmp, 'w') as f:
+        for room_id, (saved_at, state) in pending.items():
+            if room_id not in rooms and not _expired(saved_at):
+                f.write(f'{room_id}\t{saved_at!r}\t{state}\n')
+                count += 1
+        for room_id, game in rooms.items():
+            state = json.dumps(_room_state(game), separators=(',', ':'))
+            f.write(f'{room_id}\t{now!r}\t{state}\n')
+            count += 1
+    os.replace(tmp, path)
+    logger.info("Snapshotted %d rooms to %s", count, path)
+
+
+def _load_pending():
+    global _pending
+    with _pending_lock:
+        if _pending is not None:
+            return _pending
+        path = snapshot_path()
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        else:
+            # Consumed; a crash after this point must not resurrect old rooms
+            os.remove(path)
+        _pending = {}
+        for line in lines:
+            fields = line.split('\t', 2)
+            if len(fields) != 3:
+                continue
+            room_id, saved_at, state = fields
+            saved_at = float(saved_at)
+            if not _expired(saved_at):
+                _pending[room_id] = (saved_at, state)
+        if _pending:
+            logger.info("Loaded snapshot with %d rooms", len(_pending))
+        return _pending
+
+
+def restore_room(room_id):
+    entry = _load_pending().pop(room_id, None)
+    if entry is None or _expired(entry[0]):
+        return None
+    game = json.loads(entry[1])
+    for player in game['players']:
+        player['channel_name'] = None
+    return game
@@ -0,0 +1,12 @@
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+class ManifestStaticStorage(ManifestStaticFilesStorage):
+    # Hashed names once collectstatic has written staticfiles.json. Until
+    # then {% static %} falls back to plain names instead of raising, so a
+    # checkout running with DEBUG=False still renders its pages.
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
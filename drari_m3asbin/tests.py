@@ -0,0 +1,608 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+from channels.consumer import AsyncConsumer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import TestCase, override_settings
+from . import consumers, heartbeat, movelog, snapshots, timerwheel
+from .frontend import FrontendMiddleware
+from .monitoring import LoopLagMonitor, _handler_name, sample_stacks
+from .movelog import RECORD, RESULT_CELL, MoveLogWriter
+from .routing import websocket_urlpatterns
+from .timerwheel import TimerWheel
+
+
+class TimerWheelTests(TestCase):
+    def setUp(self):
+        # 3 levels of 8 slots: 512 ticks of range, so short delays already
+        # cascade and anything past 512 ticks overflows
+        self.wheel = TimerWheel(tick=1, slots=8, levels=3)
+        self.fired = []
+
+    def schedule(self, delay, name):
+        return self.wheel.schedule(delay, lambda: self.fired.append((name, self.wheel.current)))
+
+    def test_fires_on_exact_tick(self):
+        delays = [1, 2, 7, 8, 9, 63, 64, 65, 511, 512]
+        for delay in delays:
+            self.schedule(delay, delay)
+        self.wheel.advance(600)
+        self.assertEqual(self.fired, [(delay, delay) for delay in delays])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_overflow_beyond_wheel_range(self):
+        self.schedule(513, 'a')
+        self.schedule(1500, 'b')
+        self.wheel.advance(2000)
+        self.assertEqual(self.fired, [('a', 513), ('b', 1500)])
+
+    def test_cancel(self):
+        keep = self.schedule(70, 'keep')
+        drop = self.schedule(70, 'drop')
+        self.wheel.cancel(drop)
+        self.assertFalse(drop.active)
+        self.assertTrue(keep.active)
+        self.wheel.advance(100)
+        self.assertEqual(self.fired, [('keep', 70)])
+        # Cancelling twice or after firing is a no-op
+        self.wheel.cancel(drop)
+        self.wheel.cancel(keep)
+
+    def test_scheduled_while_running(self):
+        # Timers armed mid-way land on current + delay, across cascades
+        random.seed(1)
+        expected = {}
+        for step in range(2000):
+            if step % 3 == 0:
+                name = len(expected)
+                delay = random.randint(1, 1500)
+                expected[name] = self.wheel.current + delay
+                self.schedule(delay, name)
+            self.wheel.advance()
+        self.wheel.advance(1500)
+        self.assertEqual(dict(self.fired), expected)
+
+
+class ProbeConsumer(AsyncConsumer):
+    def handle(self):
+        return self.helper()
+
+    def helper(self):
+        # Not a consumer method, so the name comes from further up
+        def inner():
+            return _handler_name(sys._getframe())
+        return inner()
+
+
+class MonitoringTests(TestCase):
+    def test_handler_name(self):
+        self.assertEqual(ProbeConsumer().handle(), 'ProbeConsumer.helper')
+        self.assertIsNone(_handler_name(sys._getframe()))
+
+    def test_sample_stacks(self):
+        done = threading.Event()
+        worker = threading.Thread(target=done.wait, name='worker')
+        worker.start()
+        try:
+            folded = sample_stacks(0.05, interval=0.01)
+        finally:
+            done.set()
+            worker.join()
+        lines = folded.splitlines()
+        self.assertTrue(lines)
+        stacks = dict(line.rsplit(' ', 1) for line in lines)
+        worker_stacks = [stack for stack in stacks if stack.startswith('worker;')]
+        self.assertTrue(worker_stacks)
+        # Root first, leaf last; the caller's own thread is never sampled
+        self.assertTrue(all(stack.split(';')[1].startswith('_bootstrap ') for stack in worker_stacks))
+        self.assertFalse(any('sample_stacks' in stack for stack in stacks))
+        self.assertGreaterEqual(sum(int(stacks[s]) for s in worker_stacks), 3)
+
+    def test_watchdog_reports_stall_once(self):
+        monitor = LoopLagMonitor(interval=0.02, threshold=0.05)
+        # The watchdog thread outlives the loop; a beat in the future parks it
+        self.addCleanup(setattr, monitor, 'last_beat', float('inf'))
+
+        class Blocking(AsyncConsumer):
+            async def move(self):
+                time.sleep(0.3)
+
+        async def go():
+            monitor.start(asyncio.get_running_loop())
+            await asyncio.sleep(0.05)
+            await Blocking().move()
+            await asyncio.sleep(0.05)
+
+        with self.assertLogs('drari_m3asbin.monitoring', 'WARNING') as logs:
+            asyncio.run(go())
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('in Blocking.move', logs.output[0])
+        self.assertEqual(monitor.slow_callbacks, 1)
+        self.assertGreater(monitor.max_lag, 0.2)
+
+
+class MoveLogTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def analytics(self):
+        # The offline readers need numpy, the game server doesn't
+        try:
+            from . import moveanalytics
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        return moveanalytics
+
+    def write(self, events, segment_bytes=1024):
+        async def go():
+            writer = MoveLogWriter(self.directory, segment_bytes, flush_interval=60)
+            # One flush per game, so small segments rotate
+            for game in events:
+                for event in game:
+                    writer.append(*event)
+                await writer.flush()
+            writer.segment.close()
+        asyncio.run(go())
+
+    def test_round_trip_and_opening_rates(self):
+        analytics = self.analytics()
+        self.write([
+            # Opened at 4, opener (X) wins
+            [('r1', 1, 1, 4, 'X'), ('r1', 1, 2, 0, 'O'), ('r1', 1, 3, RESULT_CELL, 'X')],
+            # Same room again after it was freed: new game id, seq restarts
+            [('r1', 2, 1, 4, 'X'), ('r1', 2, 2, RESULT_CELL, '-')],
+            # Opened at 0 by O, X wins
+            [('r2', 3, 1, 0, 'O'), ('r2', 3, 2, 4, 'X'), ('r2', 3, 3, RESULT_CELL, 'X')],
+            # Unfinished games don't count
+            [('r3', 4, 1, 2, 'X')],
+        ], segment_bytes=RECORD.size * 2)
+
+        self.assertGreater(len(analytics.segment_paths(self.directory)), 1)
+        moves = analytics.load_moves(self.directory)
+        self.assertEqual(analytics.MOVE_DTYPE.itemsize, RECORD.size)
+        self.assertEqual(len(moves), 9)
+
+        self.assertEqual(analytics.opening_win_rates(moves), {
+            0: {'games': 1, 'win_rate': 0.0, 'draw_rate': 0.0},
+            4: {'games': 2, 'win_rate': 0.5, 'draw_rate': 0.5},
+        })
+
+        replayed = analytics.replay(moves, 'r1')
+        self.assertEqual(
+            [(int(m['game']), int(m['seq']), int(m['cell'])) for m in replayed],
+            [(1, 1, 4), (1, 2, 0), (1, 3, RESULT_CELL), (2, 1, 4), (2, 2, RESULT_CELL)],
+        )
+
+    def test_torn_record_is_ignored(self):
+        analytics = self.analytics()
+        self.write([[('r1', 1, 1, 4, 'X')]])
+        path = analytics.segment_paths(self.directory)[0]
+        with open(path, 'ab') as f:
+            f.write(b'\0' * (RECORD.size // 2))
+        self.assertEqual(len(analytics.read_segment(path)), 1)
+
+    def test_full_buffer_flush_errors_are_logged(self):
+        # A file where the segment directory should be makes every write fail
+        blocked = os.path.join(self.directory, 'blocked')
+        open(blocked, 'w').close()
+
+        async def go():
+            writer = MoveLogWriter(os.path.join(blocked, 'movelog'), 1024, flush_interval=60,
+                                   buffer_bytes=RECORD.size)
+            writer.append('r1', 1, 1, 4, 'X')
+            self.assertIsNotNone(writer.flush_task)
+            await writer.flush_task
+
+        with self.assertLogs('drari_m3asbin.movelog', 'ERROR'):
+            asyncio.run(go())
+
+    def test_long_room_id_is_rejected(self):
+        writer = MoveLogWriter(self.directory, 1024, flush_interval=60)
+        with self.assertRaises(ValueError):
+            writer.append('x' * 17, 1, 1, 4, 'X')
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'rooms.jsonl')
+        override = override_settings(ROOM_SNAPSHOT_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Each test is a fresh worker that hasn't read a snapshot yet
+        snapshots._pending = None
+        self.addCleanup(setattr, snapshots, '_pending', None)
+
+    def room(self, **state):
+        game = {
+            'board': ['X', None, None, None, 'O', None, None, None, None],
+            'game_id': 42,
+            'seq': 2,
+            'players': [
+                {'username': 'alice', 'symbol': 'X', 'channel_name': 'specific.a'},
+                {'username': 'bob', 'symbol': 'O', 'channel_name': 'specific.b'},
+            ],
+            'current_turn': 'alice',
+            'game_over': False,
+            'winner': None,
+        }
+        game.update(state)
+        return game
+
+    def restart(self):
+        snapshots._pending = None
+
+    def test_restores_same_state(self):
+        game = self.room()
+        snapshots.write_snapshot({'abc123': game})
+        self.restart()
+
+        restored = snapshots.restore_room('abc123')
+        # Channels die with the worker; everything else comes back as-is
+        expected = dict(game, players=[dict(p, channel_name=None) for p in game['players']])
+        self.assertEqual(restored, expected)
+        self.assertIsNone(snapshots.restore_room('abc123'))
+        self.assertIsNone(snapshots.restore_room('missing'))
+
+    def test_snapshot_is_consumed(self):
+        snapshots.write_snapshot({'abc123': self.room()})
+        self.restart()
+        snapshots.restore_room('other')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unclaimed_rooms_survive_next_restart(self):
+        snapshots.write_snapshot({'old': self.room(), 'back': self.room()})
+        self.restart()
+        back = snapshots.restore_room('back')
+        back['seq'] = 3
+        snapshots.write_snapshot({'back': back, 'new': self.room(seq=0)})
+        self.restart()
+
+        self.assertEqual(snapshots.restore_room('old')['seq'], 2)
+        self.assertEqual(snapshots.restore_room('back')['seq'], 3)
+        self.assertEqual(snapshots.restore_room('new')['seq'], 0)
+
+    def test_expired_rooms_are_dropped(self):
+        with override_settings(ROOM_SNAPSHOT_TTL=60):
+            with mock.patch('time.time', return_value=1000.0):
+                snapshots.write_snapshot({'old': self.room()})
+            self.restart()
+            with mock.patch('time.time', return_value=1030.0):
+                # Carried over with its original time, not the restart's
+                snapshots.write_snapshot({'new': self.room()})
+            self.restart()
+            with mock.patch('time.time', return_value=1070.0):
+                self.assertIsNone(snapshots.restore_room('old'))
+                self.assertIsNotNone(snapshots.restore_room('new'))
+
+
+class FrontendMiddlewareTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        dist = os.path.join(tmp.name, 'dist')
+        self.files = {
+            'index.html': b'<html>app</html>',
+            'index.html.gz': b'gzipped index',
+            'assets/app-1a2b.js': b'console.log(1)',
+            'assets/app-1a2b.js.br': b'brotli app',
+            'assets/app-1a2b.js.gz': b'gzipped app',
+        }
+        for name, body in self.files.items():
+            path = os.path.join(dist, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(body)
+        override = override_settings(FRONTEND_DIST_DIR=dist, STATIC_ROOT=None)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.passed = []
+
+        async def app(scope, receive, send):
+            self.passed.append(scope['path'])
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'django'})
+
+        self.middleware = FrontendMiddleware(app)
+
+    def get(self, path, method='GET', extensions=None, **headers):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'headers': [(name.replace('_', '-').encode(), value.encode()) for name, value in headers.items()],
+        }
+        if extensions is not None:
+            scope['extensions'] = extensions
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.middleware(scope, receive, send))
+        start = messages[0]
+        body = b''.join(m.get('body', b'') for m in messages[1:])
+        return start['status'], dict(start['headers']), body, messages
+
+    def test_prefers_brotli_then_gzip(self):
+        _, headers, body, _ = self.get('/assets/app-1a2b.js', accept_encoding='gzip, deflate, br')
+        self.assertEqual((headers[b'content-encoding'], body), (b'br', b'brotli app'))
+        self.assertEqual(headers[b'content-length'], b'10')
+        self.assertEqual(headers[b'vary'], b'Accept-Encoding')
+
+        _, headers, body, _ = self.get('/assets/app-1a2b.js', accept_encoding='gzip')
+        self.assertEqual((headers[b'content-encoding'], body), (b'gzip', b'gzipped app'))
+
+        _, headers, body, _ = self.get('/assets/app-1a2b.js')
+        self.assertNotIn(b'content-encoding', headers)
+        self.assertEqual(body, b'console.log(1)')
+
+    def test_etag_per_encoding(self):
+        etags = {
+            encoding: self.get('/assets/app-1a2b.js', accept_encoding=encoding)[1][b'etag'].decode()
+            for encoding in ('br', 'gzip', 'identity')
+        }
+        self.assertEqual(len(set(etags.values())), 3)
+
+        status, headers, body, _ = self.get('/assets/app-1a2b.js', accept_encoding='br', if_none_match=etags['br'])
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(headers[b'etag'], etags['br'].encode())
+        # A cached brotli body is no good to a client that only takes gzip
+        status, _, _, _ = self.get('/assets/app-1a2b.js', accept_encoding='gzip', if_none_match=etags['br'])
+        self.assertEqual(status, 200)
+
+    def test_if_none_match_list_weak_and_star(self):
+        etag = self.get('/index.html')[1][b'etag'].decode()
+        for header in (f'"other", {etag}', f'W/{etag}', f'"other",W/{etag}', '*'):
+            self.assertEqual(self.get('/index.html', if_none_match=header)[0], 304, header)
+        self.assertEqual(self.get('/index.html', if_none_match='"other", W/"nope"')[0], 200)
+
+    def test_cache_control(self):
+        self.assertEqual(self.get('/assets/app-1a2b.js')[1][b'cache-control'],
+                         b'public, max-age=31536000, immutable')
+        self.assertEqual(self.get('/index.html')[1][b'cache-control'], b'no-cache')
+
+    def test_spa_fallback(self):
+        status, headers, body, _ = self.get('/play/abc', accept='text/html,application/xhtml+xml')
+        self.assertEqual((status, body), (200, b'<html>app</html>'))
+        self.assertEqual(headers[b'cache-control'], b'no-cache')
+        self.assertEqual(self.passed, [])
+
+        # Not a page load, so Django answers (with its 404)
+        self.get('/play/abc', accept='application/json')
+        self.assertEqual(self.passed, ['/play/abc'])
+
+    def test_backend_prefixes_never_fall_back(self):
+        for path in ('/api/user/', '/admin/', '/ws/tictactoe/r1/alice/', '/static/admin/css/base.css'):
+            self.assertEqual(self.get(path, accept='text/html')[2], b'django')
+        self.assertEqual(len(self.passed), 4)
+
+    def test_head(self):
+        status, headers, body, messages = self.get('/assets/app-1a2b.js', method='HEAD')
+        self.assertEqual((status, body), (200, b''))
+        self.assertEqual(headers[b'content-length'], b'14')
+        self.assertEqual(len(messages), 2)
+
+    def test_passthrough(self):
+        self.assertEqual(self.get('/index.html', method='POST')[2], b'django')
+        self.assertEqual(self.get('/missing.js')[2], b'django')
+        self.assertEqual(self.passed, ['/index.html', '/missing.js'])
+
+    def test_pathsend(self):
+        _, _, _, messages = self.get('/index.html', extensions={'http.response.pathsend': {}})
+        self.assertEqual(messages[-1]['type'], 'http.response.pathsend')
+        self.assertTrue(messages[-1]['path'].endswith('index.html'))
+
+
+class StaticStorageTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Changing STATIC_ROOT also resets the storage and its manifest
+        override = override_settings(STATIC_ROOT=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_plain_names_before_collectstatic(self):
+        # DEBUG is off in tests and no manifest has been written
+        self.assertEqual(static('admin/css/base.css'), '/static/admin/css/base.css')
+        self.assertEqual(self.client.get('/admin/login/').status_code, 200)
+
+    def test_hashed_names_after_collectstatic(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.assertRegex(static('admin/css/base.css'), r'^/static/admin/css/base\.[0-9a-f]{12}\.css$')
+
+
+class ConsumerTestCase(TestCase):
+    # Every test gets a fresh worker: no rooms, no queue and its own wheel,
+    # heartbeat scheduler and move log bound to the test's event loop
+    settings = {}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        override = override_settings(
+            ROOM_SNAPSHOT_PATH=os.path.join(tmp.name, 'rooms.jsonl'),
+            MOVE_LOG_DIR=os.path.join(tmp.name, 'movelog'),
+            TURN_TIMEOUT=0,
+            **self.settings,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        for module, name in [
+            (snapshots, '_pending'), (timerwheel, '_wheel'),
+            (heartbeat, '_scheduler'), (movelog, '_writer'),
+        ]:
+            setattr(module, name, None)
+            self.addCleanup(setattr, module, name, None)
+        for registry in [consumers.GAME_ROOMS, consumers.TURN_TIMERS,
+                         consumers.RECONNECT_TIMERS, consumers.WAITING_PLAYERS]:
+            registry.clear()
+            self.addCleanup(registry.clear)
+
+    def communicator(self, path):
+        return WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+
+
+class RestoredRoomTests(ConsumerTestCase):
+    settings = {'RECONNECT_TIMEOUT': 0.3}
+
+    def setUp(self):
+        super().setUp()
+        snapshots.write_snapshot({'r1': {
+            'board': ['X', None, None, None, 'O', None, None, None, None],
+            'game_id': 7,
+            'seq': 2,
+            'players': [
+                {'username': 'alice', 'symbol': 'X', 'channel_name': 'specific.a'},
+                {'username': 'bob', 'symbol': 'O', 'channel_name': 'specific.b'},
+            ],
+            'current_turn': 'alice',
+            'game_over': False,
+            'winner': None,
+        }})
+        snapshots._pending = None
+
+    async def test_absent_player_forfeits(self):
+        alice = self.communicator('/ws/tictactoe/r1/alice/')
+        await alice.connect()
+        self.assertEqual((await alice.receive_json_from())['type'], 'game_state')
+        self.assertIn('r1', consumers.RECONNECT_TIMERS)
+
+        update = await alice.receive_json_from(timeout=2)
+        self.assertEqual(update['type'], 'game_state')
+        self.assertEqual((update['game_over'], update['winner']), (True, 'alice'))
+        left = await alice.receive_json_from()
+        self.assertEqual((left['type'], left['username']), ('player_left', 'bob'))
+        self.assertEqual([p['username'] for p in consumers.GAME_ROOMS['r1']['players']], ['alice'])
+        await alice.disconnect()
+        self.assertNotIn('r1', consumers.GAME_ROOMS)
+
+    async def test_room_without_channels_is_deleted(self):
+        alice = self.communicator('/ws/tictactoe/r1/alice/')
+        await alice.connect()
+        await alice.receive_json_from()
+        await alice.disconnect()
+        # bob's seat has no channel, so nobody is left to play
+        self.assertNotIn('r1', consumers.GAME_ROOMS)
+        self.assertNotIn('r1', consumers.RECONNECT_TIMERS)
+
+    async def test_both_players_back_disarms_deadline(self):
+        alice = self.communicator('/ws/tictactoe/r1/alice/')
+        bob = self.communicator('/ws/tictactoe/r1/bob/')
+        await alice.connect()
+        await bob.connect()
+        self.assertNotIn('r1', consumers.RECONNECT_TIMERS)
+        await asyncio.sleep(0.5)
+        self.assertFalse(consumers.GAME_ROOMS['r1']['game_over'])
+        await alice.disconnect()
+        await bob.disconnect()
+
+
+class HeartbeatTests(ConsumerTestCase):
+    # Pings are left to the tests; only the timeout is short
+    settings = {'HEARTBEAT_INTERVAL': 60, 'HEARTBEAT_TIMEOUT': 0.3}
+
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        for username in ('alice', 'bob'):
+            User.objects.create_user(username=username, password=None)
+
+    def channel_of(self, username):
+        return next(name for name, consumer in heartbeat.get_scheduler().consumers.items()
+                    if consumer.username == username)
+
+    async def assert_closed(self, communicator):
+        # Skips whatever was sent before the close
+        while (await communicator.receive_output())['type'] != 'websocket.close':
+            pass
+
+    async def test_silent_player_is_not_matched(self):
+        alice = self.communicator('/ws/matchmaking/alice/')
+        await alice.connect()
+        self.assertEqual((await alice.receive_json_from())['type'], 'waiting')
+        await asyncio.sleep(0.4)
+
+        bob = self.communicator('/ws/matchmaking/bob/')
+        await bob.connect()
+        self.assertEqual((await bob.receive_json_from())['type'], 'waiting')
+        await self.assert_closed(alice)
+        self.assertEqual([p['username'] for p in consumers.WAITING_PLAYERS], ['bob'])
+        self.assertEqual(heartbeat.get_scheduler().stats()['reaped'], {'MatchmakingConsumer': 1})
+        await bob.disconnect()
+
+    async def test_live_player_is_matched(self):
+        alice = self.communicator('/ws/matchmaking/alice/')
+        await alice.connect()
+        await alice.receive_json_from()
+        await asyncio.sleep(0.2)
+        await alice.send_json_to({'type': 'pong'})
+        await asyncio.sleep(0.2)
+
+        bob = self.communicator('/ws/matchmaking/bob/')
+        await bob.connect()
+        found = await bob.receive_json_from()
+        self.assertEqual((found['type'], found['opponent']), ('match_found', 'alice'))
+        self.assertEqual((await alice.receive_json_from())['opponent'], 'bob')
+        self.assertEqual(consumers.WAITING_PLAYERS, [])
+        await alice.disconnect()
+        await bob.disconnect()
+
+    async def test_reap_waiting_player(self):
+        alice = self.communicator('/ws/matchmaking/alice/')
+        await alice.connect()
+        await alice.receive_json_from()
+
+        await heartbeat.get_scheduler().reap(self.channel_of('alice'))
+        await self.assert_closed(alice)
+        self.assertEqual(consumers.WAITING_PLAYERS, [])
+        self.assertEqual(heartbeat.get_scheduler().stats(), {
+            'connections': 0, 'reaped': {'MatchmakingConsumer': 1},
+        })
+
+    async def test_reap_frees_seat(self):
+        alice = self.communicator('/ws/tictactoe/r1/alice/')
+        bob = self.communicator('/ws/tictactoe/r1/bob/')
+        await alice.connect()
+        await bob.connect()
+        for message in ('game_state', 'game_ready'):
+            self.assertEqual((await alice.receive_json_from())['type'], message)
+
+        await heartbeat.get_scheduler().reap(self.channel_of('bob'))
+        await self.assert_closed(bob)
+        left = await alice.receive_json_from()
+        self.assertEqual((left['type'], left['username']), ('player_left', 'bob'))
+        self.assertEqual([p['username'] for p in consumers.GAME_ROOMS['r1']['players']], ['alice'])
+
+        await heartbeat.get_scheduler().reap(self.channel_of('alice'))
+        await self.assert_closed(alice)
+        self.assertNotIn('r1', consumers.GAME_ROOMS)
+        self.assertEqual(heartbeat.get_scheduler().stats()['reaped'], {'TicTacToeConsumer': 2})
+
+    @override_settings(HEARTBEAT_INTERVAL=0.1)
+    async def test_scheduler_pings_and_reaps(self):
+        heartbeat._scheduler = None
+        alice = self.communicator('/ws/matchmaking/alice/')
+        await alice.connect()
+        await alice.receive_json_from()
+        self.assertEqual((await alice.receive_json_from(timeout=1))['type'], 'ping')
+        await self.assert_closed(alice)
+        self.assertEqual(consumers.WAITING_PLAYERS, [])
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import math
+import time
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ('expires', 'callback', 'args', 'bucket')
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.bucket = None
+
+    @property
+    def active(self):
+        return self.bucket is not None
+
+
+class TimerWheel:
+    # Hierarchical hashed timer wheel. Level 0 has one slot per tick, each
+    # level above covers `slots` times the range of the one below. Timers
+    # sit in a set in exactly one slot, so schedule() and cancel() are a
+    # set insert/discard no matter how many timers exist. Slots of upper
+    # levels are re-hashed one level down when the lower level wraps.
+
+    def __init__(self, tick=0.1, slots=64, levels=4):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.current = 0
+        self.started = time.monotonic()
+        self.task = None
+
+    def __len__(self):
+        return sum(len(bucket) for wheel in self.wheels for bucket in wheel)
+
+    def start(self):
+        self.started = time.monotonic() - self.current * self.tick
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def schedule(self, delay, callback, *args):
+        timer = Timer(self.current + max(1, math.ceil(delay / self.tick)), callback, args)
+        self._place(timer)
+        return timer
+
+    def cancel(self, timer):
+        if timer.bucket is not None:
+            timer.bucket.discard(timer)
+            timer.bucket = None
+
+    def _place(self, timer):
+        ticks = timer.expires - self.current
+        span = self.slots
+        for level in range(self.levels):
+            if ticks < span:
+                break
+            span *= self.slots
+        else:
+            # Further out than the wheel reaches, park it in the last top
+            # slot; it gets re-placed on every cascade until it fits
+            level = self.levels - 1
+            ticks = self.slots ** self.levels - 1
+        unit = self.slots ** level
+        bucket = self.wheels[level][((self.current + ticks) // unit) % self.slots]
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def advance(self, ticks=1):
+        for _ in range(ticks):
+            self.current += 1
+            for level in range(1, self.levels):
+                unit = self.slots ** level
+                if self.current % unit:
+                    break
+                self._cascade(level, (self.current // unit) % self.slots)
+            self._expire(self.current % self.slots)
+
+    def _cascade(self, level, index):
+        bucket = self.wheels[level][index]
+        self.wheels[level][index] = set()
+        for timer in bucket:
+            self._place(timer)
+
+    def _expire(self, index):
+        bucket = self.wheels[0][index]
+        self.wheels[0][index] = set()
+        for timer in bucket:
+            timer.bucket = None
+            if timer.expires > self.current:
+                self._place(timer)
+                continue
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+            except Exception:
+                logger.exception("Timer callback %r failed", timer.callback)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            target = int((time.monotonic() - self.started) / self.tick)
+            if target > self.current:
+                self.advance(target - self.current)
+
+
+_wheel = None
+
+
+def get_wheel():
+    # One wheel per worker, started on the running loop on first use
+    global _wheel
+    if _wheel is None:
+        _wheel = TimerWheel(getattr(settings, 'TIMER_WHEEL_TICK', 0.1))
+        _wheel.start()
+    return _wheel
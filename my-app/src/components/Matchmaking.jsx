@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import styles from '../styles/Matchmaking.module.scss'; // Adjust the path as necessary
 import { useNavigate } from 'react-router-dom';
+import { RESTART_CLOSE_CODE } from '../constants';
 
 const Matchmaking = ({ username }) => {
   const navigate = useNavigate();
@@ -19,6 +20,11 @@ const Matchmaking = ({ username }) => {
         const data = JSON.parse(event.data);
         console.log("Received data:", data);
 
+        if (data.type === 'ping') {
+          socket.current.send(JSON.stringify({ type: 'pong' }));
+          return;
+        }
+
         if (data.type === 'match_found' && !isMatchFound) {
           setIsMatchFound(true);
           sessionStorage.setItem('room', data.room);
@@ -31,6 +37,10 @@ const Matchmaking = ({ username }) => {
 
       socket.current.onclose = (event) => {
         console.log("WebSocket closed with code:", event.code);
+        if (event.code === RESTART_CLOSE_CODE) {
+          // Service restart, come back with some jitter
+          setTimeout(() => window.location.reload(), 1000 + Math.random() * 2000);
+        }
       };
     }
 
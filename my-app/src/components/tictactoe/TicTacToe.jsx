@@ -2,7 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
 import styles from '../../styles/TicTacToe.module.scss';
 import axios from 'axios';
-import { ACCESS_TOKEN } from '@/constants';
+import { ACCESS_TOKEN, RESTART_CLOSE_CODE } from '@/constants';
 
 
 const TicTacToe = () => {
@@ -36,6 +36,11 @@ const TicTacToe = () => {
     socket.current.onmessage = async (event) => {
       const data = JSON.parse(event.data);
 
+      if (data.type === 'ping') {
+        socket.current.send(JSON.stringify({ type: 'pong' }));
+        return;
+      }
+
       if (data.type === 'game_ready') {
         setStatusMessage('GAME READY! GET SET...');
         setPlayers(data.players);
@@ -77,9 +82,20 @@ const TicTacToe = () => {
         setStatusMessage(`${data.username.toUpperCase()} LEFT THE GAME`);
         setGameOver(true);
       }
+
+      if (data.type === 'reconnect') {
+        // Server is restarting; the close (RESTART_CLOSE_CODE) that follows reloads
+        setStatusMessage('SERVER RESTARTING, RECONNECTING...');
+      }
     };
 
-    socket.current.onclose = () => {
+    socket.current.onclose = (event) => {
+      if (event.code === RESTART_CLOSE_CODE) {
+        // Service restart: the room was saved, come back with some jitter
+        setStatusMessage('SERVER RESTARTING, RECONNECTING...');
+        setTimeout(() => window.location.reload(), 1000 + Math.random() * 2000);
+        return;
+      }
       setStatusMessage('CONNECTION LOST!');
     };
 
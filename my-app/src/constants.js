@@ -10,4 +10,7 @@ export const WEBSOCKET_BASE_URL = 'ws://localhost:8000';
 // Game constants
 export const PLAYER_X = 'X';
 export const PLAYER_O = 'O';
-export const DRAW = 'D';
\ No newline at end of file
+export const DRAW = 'D';
+
+// Websocket close code sent when the server restarts (see lifecycle.py)
+export const RESTART_CLOSE_CODE = 4012;
\ No newline at end of file